@@ -742,6 +742,17 @@ BEDROCK_AGENT_RUNTIME_PASS_THROUGH_ROUTES = [
     "optimize-prompt/",
 ]
 BASE_MCP_ROUTE = "/mcp"
+MCP_AUTH_CACHE_TTL_SECONDS = int(
+    os.getenv("MCP_AUTH_CACHE_TTL_SECONDS", 60)
+)  # 1 minute
+MCP_AUTH_NEGATIVE_CACHE_TTL_SECONDS = int(
+    os.getenv("MCP_AUTH_NEGATIVE_CACHE_TTL_SECONDS", 10)
+)  # failed auth results are cached for a shorter time
+MCP_AUTH_CACHE_MAX_SIZE = int(os.getenv("MCP_AUTH_CACHE_MAX_SIZE", 10_000))
+MCP_PERMISSION_CACHE_TTL_SECONDS = int(
+    os.getenv("MCP_PERMISSION_CACHE_TTL_SECONDS", 30)
+)  # 30 seconds
+MCP_PERMISSION_CACHE_MAX_SIZE = int(os.getenv("MCP_PERMISSION_CACHE_MAX_SIZE", 10_000))
 
 BATCH_STATUS_POLL_INTERVAL_SECONDS = int(
     os.getenv("BATCH_STATUS_POLL_INTERVAL_SECONDS", 3600)
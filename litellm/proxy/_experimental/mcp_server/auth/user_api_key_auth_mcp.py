@@ -1,13 +1,72 @@
-from typing import List, Optional, Tuple
-import json
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
 
-from starlette.datastructures import Headers
+import orjson
 from starlette.requests import Request
 from starlette.types import Scope
 
 from litellm._logging import verbose_logger
-from litellm.proxy._types import LiteLLM_TeamTable, SpecialHeaders, UserAPIKeyAuth
-from litellm.proxy.auth.user_api_key_auth import user_api_key_auth
+from litellm.caching.in_memory_cache import InMemoryCache
+from litellm.constants import (
+    MCP_AUTH_CACHE_MAX_SIZE,
+    MCP_AUTH_CACHE_TTL_SECONDS,
+    MCP_AUTH_NEGATIVE_CACHE_TTL_SECONDS,
+    MCP_PERMISSION_CACHE_MAX_SIZE,
+    MCP_PERMISSION_CACHE_TTL_SECONDS,
+)
+from litellm.proxy._types import (
+    ProxyErrorTypes,
+    ProxyException,
+    SpecialHeaders,
+    UserAPIKeyAuth,
+    hash_token,
+)
+from litellm.proxy.auth.user_api_key_auth import (
+    _get_bearer_token,
+    _is_api_key_only_auth,
+    user_api_key_auth,
+)
+
+# Lowercase header names, as they appear in raw ASGI headers
+_HDR_API_KEY = SpecialHeaders.custom_litellm_api_key.value.lower().encode("latin-1")
+_HDR_AUTH = SpecialHeaders.openai_authorization.value.lower().encode("latin-1")
+_HDR_MCP_AUTH = SpecialHeaders.mcp_auth.value.lower().encode("latin-1")
+_HDR_MCP_SERVERS = SpecialHeaders.mcp_servers.value.lower().encode("latin-1")
+_MCP_REQUEST_HEADER_NAMES = frozenset(
+    (_HDR_API_KEY, _HDR_AUTH, _HDR_MCP_AUTH, _HDR_MCP_SERVERS)
+)
+
+# Caches `user_api_key_auth` results for MCP requests, keyed by (hashed api key, route).
+# Invalid keys are cached as the ProxyException kwargs with a shorter ttl.
+# Key update / delete / block / unblock evict the key's entries. Changes made elsewhere (team block,
+# team / user budgets, user role) are only picked up once the entry expires (MCP_AUTH_CACHE_TTL_SECONDS).
+mcp_auth_cache = InMemoryCache(
+    max_size_in_memory=MCP_AUTH_CACHE_MAX_SIZE,
+    default_ttl=MCP_AUTH_CACHE_TTL_SECONDS,
+)
+
+# Caches the allowed mcp servers (List[str]) for a key's object_permission_id and for a team_id
+mcp_key_permission_cache = InMemoryCache(
+    max_size_in_memory=MCP_PERMISSION_CACHE_MAX_SIZE,
+    default_ttl=MCP_PERMISSION_CACHE_TTL_SECONDS,
+)
+mcp_team_permission_cache = InMemoryCache(
+    max_size_in_memory=MCP_PERMISSION_CACHE_MAX_SIZE,
+    default_ttl=MCP_PERMISSION_CACHE_TTL_SECONDS,
+)
+
+
+class _MCPAuthRequest(Request):
+    """
+    Request passed to `user_api_key_auth` when authenticating MCP requests.
+
+    The body is always an empty JSON object, to avoid ASGI receive channel issues.
+    This prevents "Receive channel has not been made available" error
+    """
+
+    async def body(self) -> bytes:
+        return b"{}"
+
 
 class MCPRequestHandler:
     """
@@ -46,85 +105,191 @@ class MCPRequestHandler:
 
         Raises:
             HTTPException: If headers are invalid or missing required headers
+            ProxyException: If auth fails
         """
-        headers = MCPRequestHandler._safe_get_headers_from_scope(scope)
-        litellm_api_key = (
-            MCPRequestHandler.get_litellm_api_key_from_headers(headers) or ""
+        headers = MCPRequestHandler._get_mcp_request_headers_from_scope(scope)
+        raw_litellm_api_key = headers.get(_HDR_API_KEY) or headers.get(_HDR_AUTH)
+        litellm_api_key: Optional[str] = (
+            raw_litellm_api_key.decode("latin-1") if raw_litellm_api_key else None
+        )
+        if litellm_api_key is None:
+            # requests without a key are never cached
+            validated_user_api_key_auth = await user_api_key_auth(
+                api_key="", request=_MCPAuthRequest(scope=scope)
+            )
+        else:
+            validated_user_api_key_auth = (
+                await MCPRequestHandler._cached_user_api_key_auth(
+                    api_key=litellm_api_key, scope=scope
+                )
+            )
+
+        raw_mcp_auth_header = headers.get(_HDR_MCP_AUTH)
+        mcp_auth_header = (
+            raw_mcp_auth_header.decode("latin-1")
+            if raw_mcp_auth_header is not None
+            else None
         )
-        mcp_auth_header = headers.get(MCPRequestHandler.LITELLM_MCP_AUTH_HEADER_NAME)
-        mcp_servers_header = headers.get(MCPRequestHandler.LITELLM_MCP_SERVERS_HEADER_NAME)
-        mcp_servers = None
-        if mcp_servers_header:
-            try:
-                mcp_servers = json.loads(mcp_servers_header)
-                if not isinstance(mcp_servers, list):
-                    mcp_servers = None
-            except (json.JSONDecodeError, TypeError, ValueError) as e:
-                verbose_logger.debug(f"Error parsing mcp_servers header: {e}")
-                mcp_servers = None
-
-        # Create a proper Request object with mock body method to avoid ASGI receive channel issues
-        request = Request(scope=scope)
-
-        # Mock the body method to return empty dict as JSON bytes
-        # This prevents "Receive channel has not been made available" error
-        async def mock_body():
-            return b"{}"  # Empty JSON object as bytes
-
-        request.body = mock_body  # type: ignore
-
-        validated_user_api_key_auth = await user_api_key_auth(
-            api_key=litellm_api_key, request=request
+        raw_mcp_servers_header = headers.get(_HDR_MCP_SERVERS)
+        mcp_servers = MCPRequestHandler._parse_mcp_servers_header(
+            raw_mcp_servers_header.decode("latin-1")
+            if raw_mcp_servers_header is not None
+            else None
         )
 
         return validated_user_api_key_auth, mcp_auth_header, mcp_servers
 
     @staticmethod
-    def get_litellm_api_key_from_headers(headers: Headers) -> Optional[str]:
+    def _parse_mcp_servers_header(
+        mcp_servers_header: Optional[str],
+    ) -> Optional[List[str]]:
         """
-        Get the Litellm API key from the headers using case-insensitive lookup
+        Parse the `x-mcp-servers` header as a JSON list of server names
 
-        1. Check if `x-litellm-api-key` is in the headers
-        2. If not, check if `Authorization` is in the headers
+        Only headers that look like a JSON array are parsed, so the common missing /
+        malformed cases return None without raising.
+        """
+        if not mcp_servers_header or not mcp_servers_header.lstrip().startswith("["):
+            return None
+        try:
+            # a valid JSON document starting with `[` is always a list
+            return orjson.loads(mcp_servers_header)
+        except ValueError as e:
+            verbose_logger.debug("Error parsing mcp_servers header: %s", e)
+            return None
 
-        Args:
-            headers: Starlette Headers object that handles case insensitivity
+    @staticmethod
+    async def _cached_user_api_key_auth(api_key: str, scope: Scope) -> UserAPIKeyAuth:
         """
-        # Headers object handles case insensitivity automatically
-        api_key = headers.get(MCPRequestHandler.LITELLM_API_KEY_HEADER_NAME_PRIMARY)
-        if api_key:
-            return api_key
+        Run `user_api_key_auth` for the given api key, reusing a recent result if one is cached.
 
-        auth_header = headers.get(
-            MCPRequestHandler.LITELLM_API_KEY_HEADER_NAME_SECONDARY
-        )
-        if auth_header:
-            return auth_header
+        Results are only cached when auth is decided by the api key alone (see `_is_api_key_only_auth`)
+        and the key has a `Bearer ` prefix. A cached result is only reused for the same route, and per-request
+        fields (`parent_otel_span`) are not shared across requests.
+
+        Keys not found in the DB are cached for `MCP_AUTH_NEGATIVE_CACHE_TTL_SECONDS` and a new
+        ProxyException is raised on a hit, so repeated requests with an invalid key do not hit the DB.
+        Valid keys are never cached past their `expires`. Other errors and the DB-unavailable
+        fallback are never cached.
+        The Request for `user_api_key_auth` is only built on a cache miss.
+        """
+        hashed_token = MCPRequestHandler._get_auth_cache_key(api_key)
+        if hashed_token is None or not _is_api_key_only_auth():
+            return await user_api_key_auth(
+                api_key=api_key, request=_MCPAuthRequest(scope=scope)
+            )
 
-        return None
+        cache_key = (hashed_token, scope.get("path", ""))
+        cached_result = mcp_auth_cache.get_cache(key=cache_key)
+        if isinstance(cached_result, UserAPIKeyAuth):
+            return cached_result.model_copy()
+        if cached_result is not None:
+            raise ProxyException(**cached_result)
+
+        try:
+            validated_user_api_key_auth = await user_api_key_auth(
+                api_key=api_key, request=_MCPAuthRequest(scope=scope)
+            )
+        except ProxyException as e:
+            if e.type == ProxyErrorTypes.token_not_found_in_db:
+                mcp_auth_cache.set_cache(
+                    key=cache_key,
+                    value={
+                        "message": e.message,
+                        "type": e.type,
+                        "param": e.param,
+                        "code": e.code,
+                        "headers": e.headers,
+                        "openai_code": e.openai_code,
+                    },
+                    ttl=MCP_AUTH_NEGATIVE_CACHE_TTL_SECONDS,
+                )
+            raise e
+
+        ttl = MCPRequestHandler._get_auth_cache_ttl(validated_user_api_key_auth)
+        # `user_api_key_auth` fails open with this token when the DB is unreachable
+        if (
+            validated_user_api_key_auth.token != "failed-to-connect-to-db"
+            and ttl > 0
+        ):
+            mcp_auth_cache.set_cache(
+                key=cache_key,
+                value=validated_user_api_key_auth.model_copy(
+                    update={"parent_otel_span": None}
+                ),
+                ttl=ttl,
+            )
+        return validated_user_api_key_auth
 
     @staticmethod
-    def _safe_get_headers_from_scope(scope: Scope) -> Headers:
+    def _get_auth_cache_ttl(user_api_key_auth: UserAPIKeyAuth) -> float:
+        """
+        Cache a valid key for `MCP_AUTH_CACHE_TTL_SECONDS`, or until the key expires if that is sooner
         """
-        Safely extract headers from ASGI scope using Starlette's Headers class
-        which handles case insensitivity and proper header parsing.
+        if user_api_key_auth.expires is None:
+            return MCP_AUTH_CACHE_TTL_SECONDS
+        if isinstance(user_api_key_auth.expires, datetime):
+            expiry_time = user_api_key_auth.expires
+        else:
+            expiry_time = datetime.fromisoformat(user_api_key_auth.expires)
+        if (
+            expiry_time.tzinfo is None
+            or expiry_time.tzinfo.utcoffset(expiry_time) is None
+        ):
+            expiry_time = expiry_time.replace(tzinfo=timezone.utc)
+        seconds_to_expiry = (expiry_time - datetime.now(timezone.utc)).total_seconds()
+        return min(MCP_AUTH_CACHE_TTL_SECONDS, seconds_to_expiry)
 
-        ASGI headers are in format: List[List[bytes, bytes]]
-        We need to convert them to the format Headers expects.
+    @staticmethod
+    def _get_auth_cache_key(api_key: str) -> Optional[str]:
         """
-        try:
-            # ASGI headers are list of [name: bytes, value: bytes] pairs
-            raw_headers = scope.get("headers", [])
-            # Convert bytes to strings and create dict for Headers constructor
-            headers_dict = {
-                name.decode("latin-1"): value.decode("latin-1")
-                for name, value in raw_headers
-            }
-            return Headers(headers_dict)
-        except (UnicodeDecodeError, AttributeError, TypeError) as e:
-            verbose_logger.exception(f"Error getting headers from scope: {e}")
-            # Return empty Headers object with empty dict
-            return Headers({})
+        Hash the api key the way `user_api_key_auth` reads it, so raw keys are never held in memory.
+
+        `user_api_key_auth` only accepts keys with a `Bearer ` (or `Basic `) prefix, so keys without
+        one are not cached (returns None). For virtual keys this matches the hashed token stored in the DB.
+        """
+        bearer_token = _get_bearer_token(api_key=api_key)
+        if not bearer_token:
+            return None
+        return hash_token(bearer_token)
+
+    @classmethod
+    def invalidate(cls, api_key: str) -> None:
+        """
+        Evict the cached auth result for a raw api key
+        """
+        hashed_token = cls._get_auth_cache_key(api_key)
+        if hashed_token is not None:
+            cls.invalidate_hashed_token(hashed_token)
+
+    @classmethod
+    def invalidate_hashed_token(cls, hashed_token: str) -> None:
+        """
+        Evict the cached auth results (for every route) for an already hashed key
+
+        Used by the key update / delete paths, which only have the hashed token.
+        """
+        for cache_key in list(mcp_auth_cache.cache_dict.keys()):
+            if isinstance(cache_key, tuple) and cache_key[0] == hashed_token:
+                mcp_auth_cache.delete_cache(key=cache_key)
+
+    @staticmethod
+    def _get_mcp_request_headers_from_scope(scope: Scope) -> Dict[bytes, bytes]:
+        """
+        Collect the raw values of the headers read by `process_mcp_request` in a single pass
+        over the ASGI headers.
+
+        Returns:
+            Dict[bytes, bytes]: lowercase header name -> raw value, first occurrence wins
+        """
+        headers: Dict[bytes, bytes] = {}
+        # ASGI guarantees `headers` is an iterable of (bytes, bytes) pairs
+        for name, value in scope.get("headers", ()):
+            if not name.islower():
+                name = name.lower()
+            if name in _MCP_REQUEST_HEADER_NAMES and name not in headers:
+                headers[name] = value
+        return headers
 
     @staticmethod
     async def get_allowed_mcp_servers(
@@ -133,87 +298,111 @@ class MCPRequestHandler:
         """
         Get list of allowed MCP servers for the given user/key based on permissions
         """
-        from typing import List
-
-        allowed_mcp_servers: List[str] = []
-        allowed_mcp_servers_for_key = (
-            await MCPRequestHandler._get_allowed_mcp_servers_for_key(user_api_key_auth)
-        )
-        allowed_mcp_servers_for_team = (
-            await MCPRequestHandler._get_allowed_mcp_servers_for_team(user_api_key_auth)
+        (
+            allowed_mcp_servers_for_key,
+            allowed_mcp_servers_for_team,
+        ) = await MCPRequestHandler._get_allowed_mcp_servers_for_key_and_team(
+            user_api_key_auth
         )
 
         #########################################################
         # If team has mcp_servers, then key must have a subset of the team's mcp_servers
         #########################################################
+        allowed_mcp_servers = set(allowed_mcp_servers_for_key)
         if len(allowed_mcp_servers_for_team) > 0:
-            for _mcp_server in allowed_mcp_servers_for_key:
-                if _mcp_server in allowed_mcp_servers_for_team:
-                    allowed_mcp_servers.append(_mcp_server)
-        else:
-            allowed_mcp_servers = allowed_mcp_servers_for_key
-
-        return list(set(allowed_mcp_servers))
-
-    @staticmethod
-    async def _get_allowed_mcp_servers_for_key(
-        user_api_key_auth: Optional[UserAPIKeyAuth] = None,
-    ) -> List[str]:
-        from litellm.proxy.proxy_server import prisma_client
-
-        if user_api_key_auth is None:
-            return []
-
-        if user_api_key_auth.object_permission_id is None:
-            return []
-
-        if prisma_client is None:
-            verbose_logger.debug("prisma_client is None")
-            return []
-
-        key_object_permission = (
-            await prisma_client.db.litellm_objectpermissiontable.find_unique(
-                where={"object_permission_id": user_api_key_auth.object_permission_id},
-            )
-        )
-        if key_object_permission is None:
-            return []
+            allowed_mcp_servers &= set(allowed_mcp_servers_for_team)
 
-        return key_object_permission.mcp_servers or []
+        return list(allowed_mcp_servers)
 
     @staticmethod
-    async def _get_allowed_mcp_servers_for_team(
+    async def _get_allowed_mcp_servers_for_key_and_team(
         user_api_key_auth: Optional[UserAPIKeyAuth] = None,
-    ) -> List[str]:
+    ) -> Tuple[List[str], List[str]]:
         """
-        The `object_permission` for a team is not stored on the user_api_key_auth object
+        Get the allowed MCP servers for the key and for the key's team in a single DB query
+
+        The key's object permission is matched by `object_permission_id`, the team's through
+        the `teams` relation. Teams are included (filtered to the key's team) so a permission
+        row shared by the key and the team is attributed to both.
 
-        first we check if the team has a object_permission_id attached
-            - if it does then we look up the object_permission for the team
+        Returns:
+            Tuple[List[str], List[str]]: (mcp servers for key, mcp servers for team)
         """
         from litellm.proxy.proxy_server import prisma_client
 
         if user_api_key_auth is None:
-            return []
+            return [], []
+
+        object_permission_id = user_api_key_auth.object_permission_id
+        team_id = user_api_key_auth.team_id
+        if object_permission_id is None and team_id is None:
+            return [], []
 
-        if user_api_key_auth.team_id is None:
-            return []
+        cached_mcp_servers_for_key: Optional[List[str]] = (
+            mcp_key_permission_cache.get_cache(key=object_permission_id)
+            if object_permission_id is not None
+            else []
+        )
+        cached_mcp_servers_for_team: Optional[List[str]] = (
+            mcp_team_permission_cache.get_cache(key=team_id)
+            if team_id is not None
+            else []
+        )
+        if (
+            cached_mcp_servers_for_key is not None
+            and cached_mcp_servers_for_team is not None
+        ):
+            return cached_mcp_servers_for_key, cached_mcp_servers_for_team
 
         if prisma_client is None:
             verbose_logger.debug("prisma_client is None")
-            return []
-
-        team_obj: Optional[LiteLLM_TeamTable] = (
-            await prisma_client.db.litellm_teamtable.find_unique(
-                where={"team_id": user_api_key_auth.team_id},
+            return [], []
+
+        where_clauses: List[dict] = []
+        if object_permission_id is not None:
+            where_clauses.append({"object_permission_id": object_permission_id})
+        if team_id is not None:
+            where_clauses.append({"teams": {"some": {"team_id": team_id}}})
+
+        object_permissions = (
+            await prisma_client.db.litellm_objectpermissiontable.find_many(
+                where={"OR": where_clauses},  # type: ignore
+                include=(
+                    {"teams": {"where": {"team_id": team_id}}}  # type: ignore
+                    if team_id is not None
+                    else None
+                ),
             )
         )
-        if team_obj is None:
-            verbose_logger.debug("team_obj is None")
-            return []
 
-        object_permissions = team_obj.object_permission
-        if object_permissions is None:
-            return []
+        allowed_mcp_servers_for_key: List[str] = []
+        allowed_mcp_servers_for_team: List[str] = []
+        for object_permission in object_permissions:
+            if object_permission.object_permission_id == object_permission_id:
+                allowed_mcp_servers_for_key = object_permission.mcp_servers or []
+            if team_id is not None and object_permission.teams:
+                allowed_mcp_servers_for_team = object_permission.mcp_servers or []
+
+        if object_permission_id is not None:
+            mcp_key_permission_cache.set_cache(
+                key=object_permission_id, value=allowed_mcp_servers_for_key
+            )
+        if team_id is not None:
+            mcp_team_permission_cache.set_cache(
+                key=team_id, value=allowed_mcp_servers_for_team
+            )
 
-        return object_permissions.mcp_servers or []
+        return allowed_mcp_servers_for_key, allowed_mcp_servers_for_team
+
+    @staticmethod
+    def purge_permissions(
+        team_id: Optional[str] = None,
+        object_permission_id: Optional[str] = None,
+    ) -> None:
+        """
+        Evict cached MCP server permissions, called when a team / object permission is updated
+        """
+        if team_id is not None:
+            mcp_team_permission_cache.delete_cache(key=team_id)
+        if object_permission_id is not None:
+            mcp_key_permission_cache.delete_cache(key=object_permission_id)
@@ -813,9 +813,14 @@ async def _delete_cache_key_object(
     user_api_key_cache: DualCache,
     proxy_logging_obj: Optional[ProxyLogging],
 ):
+    from litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp import (
+        MCPRequestHandler,
+    )
+
     key = hashed_token
 
     user_api_key_cache.delete_cache(key=key)
+    MCPRequestHandler.invalidate_hashed_token(hashed_token=key)
 
     ## UPDATE REDIS CACHE ##
     if proxy_logging_obj is not None:
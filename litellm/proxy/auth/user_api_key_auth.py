@@ -1117,6 +1117,30 @@ async def _user_api_key_auth_builder(  # noqa: PLR0915
         )
 
 
+def _is_api_key_only_auth() -> bool:
+    """
+    Returns True if `user_api_key_auth` for a route is decided by the api key alone
+
+    Returns False when custom auth, oauth2 / oauth2 proxy auth, JWT auth, a custom key header, an
+    end-user id header, an IP allowlist or a max request size is configured, since these read other
+    request data or external state.
+    Used to decide if an auth result can be reused for later requests with the same api key.
+    """
+    from litellm.proxy.proxy_server import general_settings, user_custom_auth
+
+    return (
+        user_custom_auth is None  # enterprise custom auth also needs this
+        and general_settings.get("litellm_key_header_name") is None
+        and general_settings.get("user_header_name") is None
+        and general_settings.get("enable_oauth2_auth", False) is not True
+        and general_settings.get("enable_oauth2_proxy_auth", False) is not True
+        and general_settings.get("enable_jwt_auth", False) is not True
+        # checked per request in `pre_db_read_auth_checks`
+        and general_settings.get("allowed_ips") is None
+        and general_settings.get("max_request_size_mb") is None
+    )
+
+
 @tracer.wrap()
 async def user_api_key_auth(
     request: Request,
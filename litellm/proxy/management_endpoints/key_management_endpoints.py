@@ -1729,11 +1729,17 @@ async def delete_verification_tokens(
         verbose_proxy_logger.debug(traceback.format_exc())
         raise e
 
+    from litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp import (
+        MCPRequestHandler,
+    )
+
     for key in tokens:
         user_api_key_cache.delete_cache(key)
         # remove hash token from cache
         hashed_token = hash_token(cast(str, key))
         user_api_key_cache.delete_cache(hashed_token)
+        # remove key from MCP auth cache
+        MCPRequestHandler.invalidate_hashed_token(cast(str, key))
 
     return {"deleted_keys": deleted_tokens}, _keys_being_deleted
 
@@ -2595,6 +2601,13 @@ async def block_key(
         proxy_logging_obj=proxy_logging_obj,
     )
 
+    ### remove key from MCP auth cache ###
+    from litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp import (
+        MCPRequestHandler,
+    )
+
+    MCPRequestHandler.invalidate_hashed_token(hashed_token=hashed_token)
+
     return record
 
 
@@ -2702,6 +2715,13 @@ async def unblock_key(
         proxy_logging_obj=proxy_logging_obj,
     )
 
+    ### remove key from MCP auth cache ###
+    from litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp import (
+        MCPRequestHandler,
+    )
+
+    MCPRequestHandler.invalidate_hashed_token(hashed_token=hashed_token)
+
     return record
 
 
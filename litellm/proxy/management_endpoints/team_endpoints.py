@@ -840,6 +840,14 @@ async def update_team(
         proxy_logging_obj=proxy_logging_obj,
     )
 
+    # purge cached MCP permissions once the team points at its new object permission
+    if data.object_permission is not None:
+        from litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp import (
+            MCPRequestHandler,
+        )
+
+        MCPRequestHandler.purge_permissions(team_id=team_row.team_id)
+
     # Enterprise Feature - Audit Logging. Enable with litellm.store_audit_logs = True
     if litellm.store_audit_logs is True:
         _before_value = existing_team_row.json(exclude_none=True)
@@ -90,4 +90,13 @@ async def handle_update_object_permission_common(
         f"created_object_permission_row: {created_object_permission_row}"
     )
 
+    # Evict the stale MCP server permissions for this object permission
+    from litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp import (
+        MCPRequestHandler,
+    )
+
+    MCPRequestHandler.purge_permissions(
+        object_permission_id=created_object_permission_row.object_permission_id
+    )
+
     return created_object_permission_row.object_permission_id
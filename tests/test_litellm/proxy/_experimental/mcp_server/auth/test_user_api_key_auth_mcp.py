@@ -1,6 +1,8 @@
+import asyncio
 import json
 import os
 import sys
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import orjson
@@ -14,11 +16,29 @@ sys.path.insert(
 
 from litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp import (
     MCPRequestHandler,
+    mcp_auth_cache,
+    mcp_key_permission_cache,
+    mcp_team_permission_cache,
+)
+from litellm.proxy._types import (
+    ProxyErrorTypes,
+    ProxyException,
+    UserAPIKeyAuth,
+    hash_token,
 )
-from litellm.proxy._types import UserAPIKeyAuth, SpecialHeaders
 from litellm.proxy.auth.user_api_key_auth import user_api_key_auth
 
 
+@pytest.fixture(autouse=True)
+def flush_mcp_auth_caches():
+    caches = [mcp_auth_cache, mcp_key_permission_cache, mcp_team_permission_cache]
+    for cache in caches:
+        cache.flush_cache()
+    yield
+    for cache in caches:
+        cache.flush_cache()
+
+
 @pytest.mark.asyncio
 class TestMCPRequestHandler:
 
@@ -44,7 +64,7 @@ class TestMCPRequestHandler:
                 UserAPIKeyAuth(object_permission_id="test-id"),
                 "test-id",
                 True,
-                MagicMock(mcp_servers=["server1", "server2"]),
+                MagicMock(object_permission_id="test-id", teams=None, mcp_servers=["server1", "server2"]),
                 ["server1", "server2"],
             ),
             # Test case 6: Database query returns object with None mcp_servers
@@ -52,7 +72,7 @@ class TestMCPRequestHandler:
                 UserAPIKeyAuth(object_permission_id="test-id"),
                 "test-id",
                 True,
-                MagicMock(mcp_servers=None),
+                MagicMock(object_permission_id="test-id", teams=None, mcp_servers=None),
                 [],
             ),
             # Test case 7: Database query returns object with empty mcp_servers
@@ -60,7 +80,7 @@ class TestMCPRequestHandler:
                 UserAPIKeyAuth(object_permission_id="test-id"),
                 "test-id",
                 True,
-                MagicMock(mcp_servers=[]),
+                MagicMock(object_permission_id="test-id", teams=None, mcp_servers=[]),
                 [],
             ),
         ],
@@ -73,7 +93,7 @@ class TestMCPRequestHandler:
         db_result,
         expected_result,
     ):
-        """Test _get_allowed_mcp_servers_for_key with various scenarios"""
+        """Test the key's servers from _get_allowed_mcp_servers_for_key_and_team with various scenarios"""
 
         # Setup user_api_key_auth object_permission_id if provided
         if user_api_key_auth and object_permission_id:
@@ -81,18 +101,20 @@ class TestMCPRequestHandler:
 
             # Mock prisma_client
         mock_prisma_client = MagicMock() if prisma_client_available else None
-        mock_find_unique = None
+        mock_find_many = None
 
         if mock_prisma_client:
             # Mock the database query
-            mock_find_unique = AsyncMock(return_value=db_result)
-            mock_prisma_client.db.litellm_objectpermissiontable.find_unique = (
-                mock_find_unique
+            mock_find_many = AsyncMock(
+                return_value=[db_result] if db_result is not None else []
+            )
+            mock_prisma_client.db.litellm_objectpermissiontable.find_many = (
+                mock_find_many
             )
 
         with patch("litellm.proxy.proxy_server.prisma_client", mock_prisma_client):
             # Call the method
-            result = await MCPRequestHandler._get_allowed_mcp_servers_for_key(
+            result, _ = await MCPRequestHandler._get_allowed_mcp_servers_for_key_and_team(
                 user_api_key_auth
             )
 
@@ -104,17 +126,22 @@ class TestMCPRequestHandler:
                 user_api_key_auth
                 and user_api_key_auth.object_permission_id
                 and prisma_client_available
-                and mock_find_unique
+                and mock_find_many
             ):
-                mock_find_unique.assert_called_once_with(
+                mock_find_many.assert_called_once_with(
                     where={
-                        "object_permission_id": user_api_key_auth.object_permission_id
-                    }
+                        "OR": [
+                            {
+                                "object_permission_id": user_api_key_auth.object_permission_id
+                            }
+                        ]
+                    },
+                    include=None,
                 )
-            elif mock_find_unique:
+            elif mock_find_many:
                 # If prisma_client exists but conditions aren't met, no call should be made
                 if not user_api_key_auth or not user_api_key_auth.object_permission_id:
-                    mock_find_unique.assert_not_called()
+                    mock_find_many.assert_not_called()
 
     @pytest.mark.parametrize(
         "headers,expected_api_key,expected_mcp_auth_header",
@@ -320,18 +347,22 @@ class TestMCPRequestHandler:
         }
 
         # Get headers using the internal method
-        extracted_headers = MCPRequestHandler._safe_get_headers_from_scope(scope)
+        extracted_headers = MCPRequestHandler._get_mcp_request_headers_from_scope(scope)
 
         # Verify API key extraction
-        api_key = MCPRequestHandler.get_litellm_api_key_from_headers(extracted_headers)
+        raw_api_key = extracted_headers.get(b"x-litellm-api-key") or extracted_headers.get(
+            b"authorization"
+        )
+        api_key = raw_api_key.decode("latin-1") if raw_api_key else None
         assert api_key == expected_result["api_key"]
 
         # Verify MCP auth header
-        mcp_auth = extracted_headers.get(SpecialHeaders.mcp_auth.value)
+        raw_mcp_auth = extracted_headers.get(b"x-mcp-auth")
+        mcp_auth = raw_mcp_auth.decode("latin-1") if raw_mcp_auth else None
         assert mcp_auth == expected_result["mcp_auth"]
 
         # Verify MCP servers
-        mcp_servers_header = extracted_headers.get(SpecialHeaders.mcp_servers.value)
+        mcp_servers_header = extracted_headers.get(b"x-mcp-servers")
         if mcp_servers_header:
             try:
                 mcp_servers = json.loads(mcp_servers_header)
@@ -363,3 +394,487 @@ class TestMCPRequestHandler:
             assert auth_result == mock_auth_result
             assert mcp_auth_header == expected_result["mcp_auth"]
             assert mcp_servers_result == expected_result["mcp_servers"]
+
+    async def test_process_mcp_request_caches_auth_result(self):
+        """Repeat requests with the same api key should only call user_api_key_auth once"""
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/test",
+            "headers": [(b"authorization", b"Bearer sk-1234")],
+        }
+        mock_auth_result = UserAPIKeyAuth(api_key="sk-1234", user_id="test-user-id")
+
+        with patch(
+            "litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp.user_api_key_auth",
+            new_callable=AsyncMock,
+            return_value=mock_auth_result,
+        ) as mock_auth:
+            first_result, _, _ = await MCPRequestHandler.process_mcp_request(scope)
+            second_result, _, _ = await MCPRequestHandler.process_mcp_request(scope)
+
+            assert first_result == mock_auth_result
+            assert second_result == mock_auth_result
+            mock_auth.assert_called_once()
+
+            # evicting the hashed key forces a fresh auth check
+            MCPRequestHandler.invalidate_hashed_token(hash_token("sk-1234"))
+            await MCPRequestHandler.process_mcp_request(scope)
+            assert mock_auth.call_count == 2
+
+    async def test_process_mcp_request_caches_auth_errors(self):
+        """Keys not found in the db should be rejected from the cache without calling user_api_key_auth"""
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/test",
+            "headers": [(b"x-litellm-api-key", b"Bearer sk-invalid")],
+        }
+        auth_error = ProxyException(
+            message="Authentication Error, key not found in db",
+            type=ProxyErrorTypes.token_not_found_in_db,
+            param="key",
+            code=401,
+        )
+
+        with patch(
+            "litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp.user_api_key_auth",
+            new_callable=AsyncMock,
+            side_effect=auth_error,
+        ) as mock_auth:
+            raised = []
+            for _ in range(2):
+                with pytest.raises(ProxyException) as exc_info:
+                    await MCPRequestHandler.process_mcp_request(scope)
+                raised.append(exc_info.value)
+            mock_auth.assert_called_once()
+            # a new exception is raised on a cache hit
+            assert raised[1] is not raised[0]
+            assert raised[1].message == auth_error.message
+            assert raised[1].type == ProxyErrorTypes.token_not_found_in_db
+            assert raised[1].code == "401"
+
+            MCPRequestHandler.invalidate("Bearer sk-invalid")
+            with pytest.raises(ProxyException):
+                await MCPRequestHandler.process_mcp_request(scope)
+            assert mock_auth.call_count == 2
+
+    @pytest.mark.parametrize(
+        "auth_side_effect",
+        [
+            # db errors / route checks are wrapped as generic auth errors
+            ProxyException(
+                message="Authentication Error, db error",
+                type=ProxyErrorTypes.auth_error,
+                param="None",
+                code=401,
+            ),
+            # fail open when the db is unreachable
+            UserAPIKeyAuth(
+                key_name="failed-to-connect-to-db", token="failed-to-connect-to-db"
+            ),
+        ],
+    )
+    async def test_process_mcp_request_does_not_cache_transient_auth_results(
+        self, auth_side_effect
+    ):
+        """Only a valid key or a key not found in the db should be cached"""
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/test",
+            "headers": [(b"authorization", b"Bearer sk-1234")],
+        }
+        if isinstance(auth_side_effect, UserAPIKeyAuth):
+            mock_kwargs = {"return_value": auth_side_effect}
+        else:
+            mock_kwargs = {"side_effect": auth_side_effect}
+
+        with patch(
+            "litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp.user_api_key_auth",
+            new_callable=AsyncMock,
+            **mock_kwargs,
+        ) as mock_auth:
+            for _ in range(2):
+                try:
+                    await MCPRequestHandler.process_mcp_request(scope)
+                except ProxyException:
+                    pass
+
+        assert mock_auth.call_count == 2
+        assert mcp_auth_cache.cache_dict == {}
+
+    @pytest.mark.parametrize(
+        "headers,general_settings,user_custom_auth",
+        [
+            # no api key
+            ([], {}, None),
+            # api key without `Bearer ` prefix, rejected by user_api_key_auth
+            ([(b"x-litellm-api-key", b"sk-1234")], {}, None),
+            # auth reads more than the api key
+            ([(b"authorization", b"Bearer sk-1234")], {}, AsyncMock()),
+            (
+                [(b"authorization", b"Bearer sk-1234")],
+                {"litellm_key_header_name": "x-custom-key"},
+                None,
+            ),
+            (
+                [(b"authorization", b"Bearer sk-1234")],
+                {"enable_oauth2_proxy_auth": True},
+                None,
+            ),
+            (
+                [(b"authorization", b"Bearer sk-1234")],
+                {"user_header_name": "x-end-user-id"},
+                None,
+            ),
+            # auth reads the request itself
+            (
+                [(b"authorization", b"Bearer sk-1234")],
+                {"allowed_ips": ["10.0.0.1"]},
+                None,
+            ),
+            (
+                [(b"authorization", b"Bearer sk-1234")],
+                {"max_request_size_mb": 1},
+                None,
+            ),
+        ],
+    )
+    async def test_process_mcp_request_does_not_cache_non_api_key_auth(
+        self, headers, general_settings, user_custom_auth
+    ):
+        """Auth results should only be cached when they are decided by a valid api key"""
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/test",
+            "headers": headers,
+        }
+
+        with patch("litellm.proxy.proxy_server.general_settings", general_settings), patch(
+            "litellm.proxy.proxy_server.user_custom_auth", user_custom_auth
+        ), patch(
+            "litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp.user_api_key_auth",
+            new_callable=AsyncMock,
+            return_value=UserAPIKeyAuth(),
+        ) as mock_auth:
+            for _ in range(2):
+                await MCPRequestHandler.process_mcp_request(scope)
+
+        assert mock_auth.call_count == 2
+
+    @pytest.mark.parametrize(
+        "expires_in_seconds,expected_ttl",
+        [
+            (None, 60),
+            (3600, 60),
+            (30, 30),
+            (-30, None),
+        ],
+    )
+    async def test_process_mcp_request_does_not_cache_past_key_expiry(
+        self, expires_in_seconds, expected_ttl
+    ):
+        """A valid key should not stay cached after it expires"""
+        from datetime import datetime, timedelta, timezone
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/mcp",
+            "headers": [(b"authorization", b"Bearer sk-1234")],
+        }
+        expires = (
+            datetime.now(timezone.utc) + timedelta(seconds=expires_in_seconds)
+            if expires_in_seconds is not None
+            else None
+        )
+
+        with patch(
+            "litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp.MCP_AUTH_CACHE_TTL_SECONDS",
+            60,
+        ), patch(
+            "litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp.user_api_key_auth",
+            new_callable=AsyncMock,
+            return_value=UserAPIKeyAuth(api_key="sk-1234", expires=expires),
+        ):
+            await MCPRequestHandler.process_mcp_request(scope)
+
+        cache_key = (hash_token("sk-1234"), "/mcp")
+        if expected_ttl is None:
+            assert cache_key not in mcp_auth_cache.cache_dict
+        else:
+            remaining_ttl = mcp_auth_cache.ttl_dict[cache_key] - time.time()
+            assert expected_ttl - 5 < remaining_ttl <= expected_ttl
+
+    async def test_process_mcp_request_checks_allowed_ips_on_every_request(self):
+        """A key authenticated from an allowed ip should not be accepted from another ip"""
+
+        def _scope(client_ip: str) -> dict:
+            return {
+                "type": "http",
+                "method": "POST",
+                "path": "/mcp",
+                "client": (client_ip, 1234),
+                "headers": [(b"authorization", b"Bearer sk-1234")],
+            }
+
+        with patch("litellm.proxy.proxy_server.master_key", "sk-1234"), patch(
+            "litellm.proxy.proxy_server.general_settings",
+            {"allowed_ips": ["10.0.0.1"]},
+        ):
+            await MCPRequestHandler.process_mcp_request(_scope("10.0.0.1"))
+
+            with pytest.raises(ProxyException) as exc_info:
+                await MCPRequestHandler.process_mcp_request(_scope("6.6.6.6"))
+            assert exc_info.value.code == "403"
+
+    async def test_process_mcp_request_cached_auth_is_per_route(self):
+        """A cached result should only be reused for its route, without the first request's otel span"""
+        headers = [(b"authorization", b"Bearer sk-1234")]
+        mock_auth_result = UserAPIKeyAuth(
+            api_key="sk-1234", parent_otel_span=MagicMock()
+        )
+
+        with patch(
+            "litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp.user_api_key_auth",
+            new_callable=AsyncMock,
+            return_value=mock_auth_result,
+        ) as mock_auth:
+            await MCPRequestHandler.process_mcp_request(
+                {"type": "http", "path": "/mcp", "headers": headers}
+            )
+            cached_result, _, _ = await MCPRequestHandler.process_mcp_request(
+                {"type": "http", "path": "/mcp", "headers": headers}
+            )
+            assert mock_auth.call_count == 1
+            assert cached_result.parent_otel_span is None
+
+            await MCPRequestHandler.process_mcp_request(
+                {"type": "http", "path": "/sse", "headers": headers}
+            )
+            assert mock_auth.call_count == 2
+
+    @pytest.mark.parametrize(
+        "mcp_servers_header,expected_result",
+        [
+            (None, None),
+            ("", None),
+            ('["server1", "server2"]', ["server1", "server2"]),
+            ('  ["server1"]', ["server1"]),
+            ("[]", []),
+            ('{"key": "value"}', None),
+            ('"server1"', None),
+            ("[invalid-json", None),
+        ],
+    )
+    async def test_parse_mcp_servers_header(self, mcp_servers_header, expected_result):
+        """Only headers holding a JSON list should be returned"""
+        assert (
+            MCPRequestHandler._parse_mcp_servers_header(mcp_servers_header)
+            == expected_result
+        )
+
+    @pytest.mark.parametrize(
+        "key_servers,team_servers,expected_result",
+        [
+            ([], [], []),
+            (["server1", "server2"], [], ["server1", "server2"]),
+            (["server1", "server1"], [], ["server1"]),
+            (["server1", "server2"], ["server2", "server3"], ["server2"]),
+            (["server1"], ["server2"], []),
+            ([], ["server1"], []),
+        ],
+    )
+    async def test_get_allowed_mcp_servers(
+        self, key_servers, team_servers, expected_result
+    ):
+        """Key servers should be restricted to the team's servers when the team has any"""
+        with patch.object(
+            MCPRequestHandler,
+            "_get_allowed_mcp_servers_for_key_and_team",
+            new_callable=AsyncMock,
+            return_value=(key_servers, team_servers),
+        ):
+            result = await MCPRequestHandler.get_allowed_mcp_servers(UserAPIKeyAuth())
+
+        assert sorted(result) == expected_result
+
+    @pytest.mark.parametrize(
+        "user_api_key_auth,db_result,expected_result",
+        [
+            # no key / team permissions to look up
+            (UserAPIKeyAuth(), [], ([], [])),
+            # key permission only
+            (
+                UserAPIKeyAuth(object_permission_id="key-perm"),
+                [
+                    MagicMock(
+                        object_permission_id="key-perm",
+                        mcp_servers=["server1"],
+                        teams=None,
+                    )
+                ],
+                (["server1"], []),
+            ),
+            # separate key and team permissions
+            (
+                UserAPIKeyAuth(object_permission_id="key-perm", team_id="team-1"),
+                [
+                    MagicMock(
+                        object_permission_id="key-perm",
+                        mcp_servers=["server1", "server2"],
+                        teams=[],
+                    ),
+                    MagicMock(
+                        object_permission_id="team-perm",
+                        mcp_servers=["server2"],
+                        teams=[MagicMock(team_id="team-1")],
+                    ),
+                ],
+                (["server1", "server2"], ["server2"]),
+            ),
+            # key and team share the same permission row
+            (
+                UserAPIKeyAuth(object_permission_id="shared-perm", team_id="team-1"),
+                [
+                    MagicMock(
+                        object_permission_id="shared-perm",
+                        mcp_servers=["server1"],
+                        teams=[MagicMock(team_id="team-1")],
+                    )
+                ],
+                (["server1"], ["server1"]),
+            ),
+        ],
+    )
+    async def test_get_allowed_mcp_servers_for_key_and_team(
+        self, user_api_key_auth, db_result, expected_result
+    ):
+        """Key and team permissions should be fetched in one query and attributed correctly"""
+        mock_prisma_client = MagicMock()
+        mock_find_many = AsyncMock(return_value=db_result)
+        mock_prisma_client.db.litellm_objectpermissiontable.find_many = mock_find_many
+
+        with patch("litellm.proxy.proxy_server.prisma_client", mock_prisma_client):
+            result = await MCPRequestHandler._get_allowed_mcp_servers_for_key_and_team(
+                user_api_key_auth
+            )
+
+        assert result == expected_result
+        if (
+            user_api_key_auth.object_permission_id is None
+            and user_api_key_auth.team_id is None
+        ):
+            mock_find_many.assert_not_called()
+        else:
+            mock_find_many.assert_called_once()
+
+    async def test_get_allowed_mcp_servers_for_key_and_team_uses_cache(self):
+        """Cached permissions should skip the DB until purged"""
+        user_api_key_auth = UserAPIKeyAuth(
+            object_permission_id="key-perm", team_id="team-1"
+        )
+        mock_prisma_client = MagicMock()
+        mock_find_many = AsyncMock(
+            return_value=[
+                MagicMock(
+                    object_permission_id="key-perm",
+                    mcp_servers=["server1"],
+                    teams=[MagicMock(team_id="team-1")],
+                )
+            ]
+        )
+        mock_prisma_client.db.litellm_objectpermissiontable.find_many = mock_find_many
+
+        with patch("litellm.proxy.proxy_server.prisma_client", mock_prisma_client):
+            for _ in range(2):
+                result = (
+                    await MCPRequestHandler._get_allowed_mcp_servers_for_key_and_team(
+                        user_api_key_auth
+                    )
+                )
+                assert result == (["server1"], ["server1"])
+            mock_find_many.assert_called_once()
+
+            MCPRequestHandler.purge_permissions(team_id="team-1")
+            await MCPRequestHandler._get_allowed_mcp_servers_for_key_and_team(
+                user_api_key_auth
+            )
+            assert mock_find_many.call_count == 2
+
+    async def test_process_mcp_request_passes_empty_body(self):
+        """The request passed to user_api_key_auth should not read the ASGI receive channel"""
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/test",
+            "headers": [(b"x-litellm-api-key", b"test-api-key")],
+        }
+
+        with patch(
+            "litellm.proxy._experimental.mcp_server.auth.user_api_key_auth_mcp.user_api_key_auth",
+            new_callable=AsyncMock,
+            return_value=UserAPIKeyAuth(api_key="test-api-key"),
+        ) as mock_auth:
+            await MCPRequestHandler.process_mcp_request(scope)
+
+        request_param = mock_auth.call_args.kwargs["request"]
+        assert await request_param.body() == b"{}"
+
+    @pytest.mark.parametrize(
+        "master_key,should_reject",
+        [
+            ("sk-master-key", True),
+            (None, False),
+        ],
+    )
+    async def test_process_mcp_request_missing_api_key(self, master_key, should_reject):
+        """Requests without an api key should be rejected by user_api_key_auth when a master key is set"""
+        from litellm.proxy.proxy_server import proxy_logging_obj
+
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/mcp",
+            "headers": [(b"x-mcp-servers", b'["server1"]')],
+        }
+
+        with patch("litellm.proxy.proxy_server.master_key", master_key), patch(
+            "litellm.proxy.proxy_server.general_settings", {}
+        ), patch.object(
+            proxy_logging_obj, "post_call_failure_hook", new_callable=AsyncMock
+        ) as mock_failure_hook:
+            if should_reject:
+                with pytest.raises(ProxyException) as exc_info:
+                    await MCPRequestHandler.process_mcp_request(scope)
+                assert exc_info.value.code == "401"
+                assert exc_info.value.message == (
+                    "Authentication Error, Malformed API Key passed in. "
+                    "Ensure Key has `Bearer ` prefix. Passed in: "
+                )
+                await asyncio.sleep(0)
+                mock_failure_hook.assert_called_once()
+            else:
+                _, _, mcp_servers = await MCPRequestHandler.process_mcp_request(scope)
+                assert mcp_servers == ["server1"]
+
+    async def test_get_mcp_request_headers_from_scope(self):
+        """Only MCP request headers should be collected, first occurrence wins"""
+        scope = {
+            "type": "http",
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"X-MCP-Auth", b"first-mcp-auth"),
+                (b"x-mcp-auth", b"second-mcp-auth"),
+                (b"authorization", b"Bearer sk-1234"),
+            ],
+        }
+
+        headers = MCPRequestHandler._get_mcp_request_headers_from_scope(scope)
+
+        assert headers == {
+            b"x-mcp-auth": b"first-mcp-auth",
+            b"authorization": b"Bearer sk-1234",
+        }